@@ -0,0 +1,70 @@
+# Compiles operator expressions (arithmetic, comparisons, logic, negation) into a flat
+# list of postfix instructions, so the interpreter can evaluate a whole expression tree
+# in one loop instead of recursing through __eval_expr for every node.
+#
+# Each instruction is an (opcode, arg) tuple. Anything that isn't an operator, literal
+# or plain variable (calls, lambdas, objects, obj.field names) is left to the tree
+# walker through an EVAL instruction. Expressions must already have been normalized
+# by the interpreter (fields exposed as attributes, variable names split from fields).
+from intbase import InterpreterBase
+from type_valuev4 import FALSE_VALUE, TRUE_VALUE, Type, Value, int_value
+
+LOAD_CONST = 0  # arg: Value of a literal (shared, never handed out to the program)
+LOAD_VAR = 1  # arg: var node, read from its environment slot
+BINARY_OP = 2  # arg: operator, applied to the top two values on the stack
+UNARY_OP = 3  # arg: operator, applied to the top value on the stack
+EVAL = 4  # arg: node to evaluate with the tree walker
+INT_BINARY_OP = 5  # arg: (operator, INT_OPS function), BINARY_OP specialized for ints
+
+BINARY_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+UNARY_OPS = {InterpreterBase.NEG_DEF, InterpreterBase.NOT_DEF}
+# int-with-int operations on the raw payloads. Most binary operations in a typical
+# program are on two ints, so operators found here compile to INT_BINARY_OP, which
+# the interpreter runs inline and only falls back to the generic path for other types
+INT_OPS = {
+    "+": lambda x, y: int_value(x + y),
+    "-": lambda x, y: int_value(x - y),
+    "*": lambda x, y: int_value(x * y),
+    "/": lambda x, y: int_value(x // y),
+    "==": lambda x, y: TRUE_VALUE if x == y else FALSE_VALUE,
+    "!=": lambda x, y: TRUE_VALUE if x != y else FALSE_VALUE,
+    "<": lambda x, y: TRUE_VALUE if x < y else FALSE_VALUE,
+    "<=": lambda x, y: TRUE_VALUE if x <= y else FALSE_VALUE,
+    ">": lambda x, y: TRUE_VALUE if x > y else FALSE_VALUE,
+    ">=": lambda x, y: TRUE_VALUE if x >= y else FALSE_VALUE,
+}
+LITERAL_TYPES = {
+    InterpreterBase.INT_DEF: Type.INT,
+    InterpreterBase.STRING_DEF: Type.STRING,
+    InterpreterBase.BOOL_DEF: Type.BOOL,
+}
+
+
+def is_operator(expr_ast):
+    return expr_ast.elem_type in BINARY_OPS or expr_ast.elem_type in UNARY_OPS
+
+
+def compile_expr(expr_ast):
+    code = []
+    _emit(expr_ast, code)
+    return code
+
+
+def _emit(expr_ast, code):
+    elem_type = expr_ast.elem_type
+    if elem_type in BINARY_OPS:
+        _emit(expr_ast.op1, code)
+        _emit(expr_ast.op2, code)
+        if elem_type in INT_OPS:
+            code.append((INT_BINARY_OP, (elem_type, INT_OPS[elem_type])))
+        else:
+            code.append((BINARY_OP, elem_type))
+    elif elem_type in UNARY_OPS:
+        _emit(expr_ast.op1, code)
+        code.append((UNARY_OP, elem_type))
+    elif elem_type in LITERAL_TYPES:
+        code.append((LOAD_CONST, Value(LITERAL_TYPES[elem_type], expr_ast.val)))
+    elif elem_type == InterpreterBase.VAR_DEF and expr_ast.field == "":
+        code.append((LOAD_VAR, expr_ast))
+    else:
+        code.append((EVAL, expr_ast))
@@ -1,53 +1,76 @@
 # The EnvironmentManager class keeps a mapping between each variable name (aka symbol)
 # in a brewin program and the Value object, which stores a type, and a value.
+#
+# Every symbol is interned to a slot index (normally once, when the program's AST is
+# prepared), and frame[slot] holds the binding currently visible for that symbol, or
+# None if it is unbound. Since scoping is dynamic, a single frame suffices: each scope
+# records the slots it bound along with the binding it shadowed, and pop restores them.
+# The bound dict mirrors the frame's non-None entries, so iterating the environment
+# (e.g. to capture it in a closure) only visits variables that are actually bound.
 class EnvironmentManager:
     def __init__(self):
-        self.environment = [{}]
+        self.slots = {}  # symbol -> slot index
+        self.frame = []  # slot index -> visible Value, or None if unbound
+        self.bound = {}  # slot index -> visible Value, for bound slots only
+        self.scopes = [[]]  # (slot, shadowed Value) pairs bound in each scope
+
+    # returns the slot index for symbol, allocating one the first time it's seen
+    def slot(self, symbol):
+        slot = self.slots.get(symbol)
+        if slot is None:
+            slot = len(self.frame)
+            self.slots[symbol] = slot
+            self.frame.append(None)
+        return slot
 
     # returns a VariableDef object
-    def get(self, symbol):
-        for env in reversed(self.environment):
-            if symbol in env:
-                return env[symbol]
-        return None
+    def get(self, slot):
+        return self.frame[slot]
 
-    def set(self, symbol, value, force_new_var_creation=False):
+    def set(self, slot, value, force_new_var_creation=False):
         if force_new_var_creation:
-            self.environment[-1][symbol] = value
+            self.create(slot, value)
             return
 
-        for env in reversed(self.environment):
-            if symbol in env:
-                env[symbol] = value
-                return
-
-        # symbol not found anywhere in the environment
-        self.environment[-1][symbol] = value
+        if self.frame[slot] is None:
+            # symbol not found anywhere in the environment
+            self.scopes[-1].append((slot, None))
+        self.frame[slot] = value
+        self.bound[slot] = value
 
     # create a new symbol in the top-most environment, regardless of whether that symbol exists
     # in a lower environment
-    def create(self, symbol, value):
-        self.environment[-1][symbol] = value
+    def create(self, slot, value):
+        if not any(bound_slot == slot for bound_slot, _ in self.scopes[-1]):
+            self.scopes[-1].append((slot, self.frame[slot]))
+        self.frame[slot] = value
+        self.bound[slot] = value
 
-    # used when we enter a nested block to create a new environment for that block
-    def push(self, env = None):
-        if env is None:
-            self.environment.append({})  # [{}] -> [{}, {}]
-        else:
-            self.environment.append(env)
+    # used when we enter a nested block to create a new environment for that block;
+    # each of bindings, if given, is an iterable of (slot index, Value) pairs to bind
+    # in the new scope, applied in order so a later binding shadows an earlier one
+    # (pop unwinds the scope in reverse, so the shadowed binding comes back as well)
+    def push(self, *bindings):
+        scope = []
+        frame = self.frame
+        bound = self.bound
+        for env in bindings:
+            for slot, value in env:
+                scope.append((slot, frame[slot]))
+                frame[slot] = value
+                bound[slot] = value
+        self.scopes.append(scope)
 
     # used when we exit a nested block to discard the environment for that block
     def pop(self):
-        self.environment.pop()
-
-    def __enumerate(self):
-        captured_so_far = set()
-        for captured in reversed(self.environment):
-            for var_name, value in captured.items():
-                if var_name in captured_so_far:
-                    continue
-                captured_so_far.add(var_name)
-                yield (var_name, value)
+        frame = self.frame
+        bound = self.bound
+        for slot, shadowed in reversed(self.scopes.pop()):
+            frame[slot] = shadowed
+            if shadowed is None:
+                del bound[slot]
+            else:
+                bound[slot] = shadowed
 
     def __iter__(self):
-        return self.__enumerate()
+        return iter(self.bound.items())
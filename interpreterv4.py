@@ -3,9 +3,29 @@ import copy
 from enum import Enum
 
 from brewparse import parse_program
+from compiler_v4 import (
+    BINARY_OP,
+    EVAL,
+    INT_BINARY_OP,
+    LOAD_CONST,
+    LOAD_VAR,
+    UNARY_OP,
+    compile_expr,
+    is_operator,
+)
+from element import Element
 from env_v4 import EnvironmentManager
 from intbase import InterpreterBase, ErrorType
-from type_valuev4 import Object, Closure, Type, Value, create_value, get_printable
+from type_valuev4 import (
+    Object,
+    Closure,
+    Type,
+    Value,
+    bool_value,
+    create_value,
+    get_printable,
+    int_value,
+)
 
 
 class ExecStatus(Enum):
@@ -13,12 +33,143 @@ class ExecStatus(Enum):
     RETURN = 2
 
 
+# binary operations, looked up through Interpreter.op_table
+def _add(x, y):
+    return Value(x.t, x.v + y.v)
+
+
+def _sub(x, y):
+    return Value(x.t, x.v - y.v)
+
+
+def _mul(x, y):
+    return Value(x.t, x.v * y.v)
+
+
+def _div(x, y):
+    return Value(x.t, x.v // y.v)
+
+
+def _eq(x, y):
+    return bool_value(x.v == y.v)
+
+
+def _ne(x, y):
+    return bool_value(x.v != y.v)
+
+
+def _lt(x, y):
+    return bool_value(x.v < y.v)
+
+
+def _le(x, y):
+    return bool_value(x.v <= y.v)
+
+
+def _gt(x, y):
+    return bool_value(x.v > y.v)
+
+
+def _ge(x, y):
+    return bool_value(x.v >= y.v)
+
+
+def _and(x, y):
+    return bool_value(x.v and y.v)
+
+
+def _or(x, y):
+    return bool_value(x.v or y.v)
+
+
+def _same(x, y):
+    return bool_value(x is y)
+
+
+def _not_same(x, y):
+    return bool_value(x is not y)
+
+
+# operand promotion for each binary operator, applied before looking up op_table:
+# ints used with && and || are coerced to bool, bools used in arithmetic or ordering
+# are coerced to 1/0, and ==/!= coerce both ints and bools to 1/0 (so that they
+# compare by truth value) unless both operands are ints
+def _ints_to_bools(x, y):
+    if x.t is Type.INT:
+        x = bool_value(x.v != 0)
+    if y.t is Type.INT:
+        y = bool_value(y.v != 0)
+    return (x, y)
+
+
+def _bools_to_ints(x, y):
+    if x.t is Type.BOOL:
+        x = int_value(1 if x.v else 0)
+    if y.t is Type.BOOL:
+        y = int_value(1 if y.v else 0)
+    return (x, y)
+
+
+def _truth_values(x, y):
+    if x.t is Type.INT and y.t is Type.INT:
+        return (x, y)
+    if x.t is Type.INT or x.t is Type.BOOL:
+        x = int_value(1 if x.v else 0)
+    if y.t is Type.INT or y.t is Type.BOOL:
+        y = int_value(1 if y.v else 0)
+    return (x, y)
+
+
+# unary operator -> (operand type it requires, operation on the payload)
+_UNARY_OPS = {
+    InterpreterBase.NEG_DEF: (Type.INT, lambda x: int_value(-1 * x)),
+    InterpreterBase.NOT_DEF: (Type.BOOL, lambda x: bool_value(not x)),
+}
+
+
 # Main interpreter class
 class Interpreter(InterpreterBase):
     # constants
     NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
     TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
     BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    # node types whose "name" field refers to a variable (or lambda) in the environment
+    VARIABLE_NODES = {
+        InterpreterBase.VAR_DEF,
+        InterpreterBase.FCALL_DEF,
+        InterpreterBase.ARG_DEF,
+        InterpreterBase.REFARG_DEF,
+        "=",
+    }
+    # small integer tag for every AST node type; __normalize_ast stamps these onto the
+    # parsed nodes so dispatch can index a list instead of hashing strings
+    NODE_TAGS = {
+        elem_type: tag
+        for tag, elem_type in enumerate(
+            [
+                InterpreterBase.PROGRAM_DEF,
+                InterpreterBase.FUNC_DEF,
+                InterpreterBase.LAMBDA_DEF,
+                InterpreterBase.ARG_DEF,
+                InterpreterBase.REFARG_DEF,
+                InterpreterBase.NIL_DEF,
+                InterpreterBase.INT_DEF,
+                InterpreterBase.BOOL_DEF,
+                InterpreterBase.STRING_DEF,
+                InterpreterBase.VAR_DEF,
+                InterpreterBase.OBJ_DEF,
+                InterpreterBase.FCALL_DEF,
+                InterpreterBase.MCALL_DEF,
+                InterpreterBase.NEG_DEF,
+                InterpreterBase.NOT_DEF,
+                InterpreterBase.IF_DEF,
+                InterpreterBase.WHILE_DEF,
+                InterpreterBase.RETURN_DEF,
+                "=",
+            ]
+            + sorted(BIN_OPS)
+        )
+    }
 
     # methods
     def __init__(self, console_output=True, inp=None, trace_output=False):
@@ -31,38 +182,68 @@ class Interpreter(InterpreterBase):
     # into an abstract syntax tree (ast)
     def run(self, program):
         ast = parse_program(program)
-        self.__set_up_function_table(ast)
         self.env = EnvironmentManager()
+        self.this_slot = self.env.slot(InterpreterBase.THIS_DEF)
+        self.__normalize_ast(ast)
+        self.__set_up_function_table(ast)
         main_func = self.__get_func_by_name("main", 0)
         if main_func is None:
             super().error(ErrorType.NAME_ERROR, f"Function not found")
-        self.__run_statements(main_func.func_ast.get("statements"))
+        self.__run_statements(main_func.func_ast.statements)
+
+    # walk the freshly parsed tree once, recording each node's integer tag on it and
+    # copying its fields (name, args, statements, ...) into plain attributes, so the
+    # evaluator reads node.name instead of calling node.get("name") on every visit.
+    # Nodes that refer to a variable also get that variable's name split from any
+    # field ("obj.field" -> var_name "obj", field "field") and its environment slot,
+    # and operator expressions get compiled to flat code (see compiler_v4.py).
+    def __normalize_ast(self, ast):
+        operators = []
+        pending = [ast]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, list):
+                pending.extend(node)
+            elif isinstance(node, Element):
+                node.tag = Interpreter.NODE_TAGS[node.elem_type]
+                vars(node).update(node.dict)
+                if node.elem_type == InterpreterBase.MCALL_DEF:
+                    node.slot = self.env.slot(node.objref)
+                elif node.elem_type in Interpreter.VARIABLE_NODES:
+                    node.var_name, _, node.field = node.name.partition(".")
+                    node.slot = self.env.slot(node.var_name)
+                elif is_operator(node):
+                    operators.append(node)
+                pending.extend(node.dict.values())
+        # compiling needs the operands' slots, so it waits until every node is visited
+        for node in operators:
+            node.code = compile_expr(node)
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
         empty_env = EnvironmentManager()
-        for func_def in ast.get("functions"):
-            func_name = func_def.get("name")
-            num_params = len(func_def.get("args"))
+        for func_def in ast.functions:
+            func_name = func_def.name
+            num_params = len(func_def.args)
             if func_name not in self.func_name_to_ast:
                 self.func_name_to_ast[func_name] = {}
             self.func_name_to_ast[func_name][num_params] = Closure(func_def, empty_env)
 
     def __get_func_by_name(self, name, num_params):
         if name not in self.func_name_to_ast:
-            closure_val_obj = self.env.get(name)
+            closure_val_obj = self.env.get(self.env.slot(name))
             if closure_val_obj is None:
                 return None
                 # super().error(ErrorType.NAME_ERROR, f"Function {name} not found")
-            if closure_val_obj.type() != Type.CLOSURE:
+            if closure_val_obj.t != Type.CLOSURE:
                 super().error(
                     ErrorType.TYPE_ERROR, "Trying to call function with non-closure"
                 )
-            closure = closure_val_obj.value()
-            num_formal_params = len(closure.func_ast.get("args"))
+            closure = closure_val_obj.v
+            num_formal_params = len(closure.func_ast.args)
             if num_formal_params != num_params:
                 super().error(ErrorType.TYPE_ERROR, "Invalid # of args to lambda")
-            return closure_val_obj.value()
+            return closure_val_obj.v
 
         candidate_funcs = self.func_name_to_ast[name]
         if num_params is None:
@@ -90,20 +271,10 @@ class Interpreter(InterpreterBase):
         for statement in statements:
             if self.trace_output:
                 print(statement)
-            status = ExecStatus.CONTINUE
-            if statement.elem_type == InterpreterBase.FCALL_DEF:
-                self.__call_func(statement)
-            elif statement.elem_type == "=":
-                self.__assign(statement)
-            elif statement.elem_type == Interpreter.MCALL_DEF:
-                self.__call_method(statement)
-            elif statement.elem_type == InterpreterBase.RETURN_DEF:
-                status, return_val = self.__do_return(statement)
-            elif statement.elem_type == Interpreter.IF_DEF:
-                status, return_val = self.__do_if(statement)
-            elif statement.elem_type == Interpreter.WHILE_DEF:
-                status, return_val = self.__do_while(statement)
-
+            run_statement = self.statement_dispatch[statement.tag]
+            if run_statement is None:
+                continue
+            status, return_val = run_statement(statement)
             if status == ExecStatus.RETURN:
                 self.env.pop()
                 return (status, return_val)
@@ -111,9 +282,16 @@ class Interpreter(InterpreterBase):
         self.env.pop()
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    def __do_fcall(self, call_ast):
+        self.__call_func(call_ast)
+        return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
+
+    def __do_mcall(self, call_ast):
+        self.__call_method(call_ast)
+        return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __call_func(self, call_ast):
-        func_name = call_ast.get("name")
+        func_name = call_ast.name
         if func_name == "print":
             return self.__call_print(call_ast)
         if func_name == "inputi":
@@ -121,7 +299,7 @@ class Interpreter(InterpreterBase):
         if func_name == "inputs":
             return self.__call_input(call_ast)
 
-        actual_args = call_ast.get("args")
+        actual_args = call_ast.args
         target_closure = self.__get_func_by_name(func_name, len(actual_args))
         if target_closure == None:
             super().error(ErrorType.NAME_ERROR, f"Function {func_name} not found")
@@ -129,48 +307,46 @@ class Interpreter(InterpreterBase):
             super().error(ErrorType.TYPE_ERROR, f"Function {func_name} is changed to non-function type.")
         target_ast = target_closure.func_ast
 
-        new_env = {}
-        self.__prepare_env_with_closed_variables(target_closure, new_env)
-        self.__prepare_params(target_ast, call_ast, new_env)
-        self.env.push(new_env)
-        _, return_val = self.__run_statements(target_ast.get("statements"))
+        params = self.__prepare_params(target_ast, call_ast)
+        self.env.push(target_closure.captured_env.items(), params)
+        _, return_val = self.__run_statements(target_ast.statements)
         self.env.pop()
         return return_val
 
-    def __prepare_env_with_closed_variables(self, target_closure, temp_env):
-        things = target_closure.captured_env
-        for var_name in things.keys():
-            # Updated here - ignore updates to the scope if we
-            #   altered a parameter, or if the argument is a similarly named variable
-            temp_env[var_name] = things[var_name]
-
-
-    def __prepare_params(self, target_ast, call_ast, temp_env):
-        actual_args = call_ast.get("args")
-        formal_args = target_ast.get("args")
+    # evaluates the arguments of a call in the caller's environment, returning
+    # (slot, Value) pairs for the callee's formal parameters
+    def __prepare_params(self, target_ast, call_ast):
+        actual_args = call_ast.args
+        formal_args = target_ast.args
         if len(actual_args) != len(formal_args):
             super().error(
                 ErrorType.NAME_ERROR,
                 f"Function {target_ast.get('name')} with {len(actual_args)} args not found",
             )
+        params = []
         for formal_ast, actual_ast in zip(formal_args, actual_args):
-            if formal_ast.elem_type == InterpreterBase.REFARG_DEF:
+            # only a variable can be aliased; any other argument is a temporary (which
+            # may be a shared Value, e.g. a small int) and gets its own copy
+            if (
+                formal_ast.elem_type == InterpreterBase.REFARG_DEF
+                and actual_ast.elem_type == InterpreterBase.VAR_DEF
+            ):
                 result = self.__eval_expr(actual_ast)
             else:
-                result = copy.deepcopy(self.__eval_expr(actual_ast))
-            arg_name = formal_ast.get("name")
-            temp_env[arg_name] = result
+                result = Interpreter.__copy_value(self.__eval_expr(actual_ast))
+            params.append((formal_ast.slot, result))
+        return params
 
     def __call_print(self, call_ast):
         output = ""
-        for arg in call_ast.get("args"):
+        for arg in call_ast.args:
             result = self.__eval_expr(arg)  # result is a Value object
             output = output + get_printable(result)
         super().output(output)
         return Interpreter.NIL_VALUE
 
     def __call_input(self, call_ast):
-        args = call_ast.get("args")
+        args = call_ast.args
         if args is not None and len(args) == 1:
             result = self.__eval_expr(args[0])
             super().output(get_printable(result))
@@ -179,25 +355,22 @@ class Interpreter(InterpreterBase):
                 ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
             )
         inp = super().get_input()
-        if call_ast.get("name") == "inputi":
+        if call_ast.name == "inputi":
             return Value(Type.INT, int(inp))
-        if call_ast.get("name") == "inputs":
+        if call_ast.name == "inputs":
             return Value(Type.STRING, inp)
 
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
-        src_value_obj = copy.copy(self.__eval_expr(assign_ast.get("expression")))
-        field = ""
-        if "." in var_name:
-            var_name, field = var_name.split(".")
-        target_value_obj = self.env.get(var_name)
+        field = assign_ast.field
+        src_value_obj = self.__eval_expr(assign_ast.expression).copy()
+        target_value_obj = self.env.get(assign_ast.slot)
         if field != "" and target_value_obj.t != Type.OBJECT:
             super().error(
                 ErrorType.TYPE_ERROR, f"Yee"
             )
         if target_value_obj is None and field == 'proto':
             new_obj = Value(Type.OBJECT, Object())
-            self.env.set(var_name, new_obj)
+            self.env.set(assign_ast.slot, new_obj)
             if src_value_obj.t in [Type.NIL, Type.STRING]:
                         super().error(
                             ErrorType.NAME_ERROR, f"Assigned to nil"
@@ -207,9 +380,9 @@ class Interpreter(InterpreterBase):
                     ErrorType.TYPE_ERROR, f"Non object assigned to proto"
                 )
             else:
-                new_obj.value().proto = src_value_obj
+                new_obj.v.set_proto(src_value_obj)
         elif target_value_obj is None:
-            self.env.set(var_name, src_value_obj)
+            self.env.set(assign_ast.slot, src_value_obj)
         else:
             if target_value_obj.t == Type.OBJECT and field != "":
                 if field == "proto":
@@ -222,9 +395,9 @@ class Interpreter(InterpreterBase):
                             ErrorType.TYPE_ERROR, f"Non object assigned to proto"
                         )
                     else:
-                        target_value_obj.value().proto = src_value_obj
+                        target_value_obj.v.set_proto(src_value_obj)
                 else:
-                    target_value_obj.value().set(field, src_value_obj)
+                    target_value_obj.v.set(field, src_value_obj)
             else:
             # if a close is changed to another type such as int, we cannot make function calls on it any more 
                 if target_value_obj.t == Type.CLOSURE and src_value_obj.t != Type.CLOSURE:
@@ -232,52 +405,28 @@ class Interpreter(InterpreterBase):
                 if target_value_obj == Type.OBJECT and field == "":
                     target_value_obj.v.type = src_value_obj.t                
                 target_value_obj.set(src_value_obj)
+        return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __eval_expr(self, expr_ast):
-        if expr_ast.elem_type == InterpreterBase.NIL_DEF:
-            return Interpreter.NIL_VALUE
-        if expr_ast.elem_type == InterpreterBase.INT_DEF:
-            return Value(Type.INT, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.STRING_DEF:
-            return Value(Type.STRING, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.BOOL_DEF:
-            return Value(Type.BOOL, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.VAR_DEF:
-            return self.__eval_name(expr_ast)
-        if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
-            return self.__call_func(expr_ast)
-        if expr_ast.elem_type in Interpreter.BIN_OPS:
-            return self.__eval_op(expr_ast)
-        if expr_ast.elem_type == Interpreter.NEG_DEF:
-            return self.__eval_unary(expr_ast, Type.INT, lambda x: -1 * x)
-        if expr_ast.elem_type == Interpreter.NOT_DEF:
-            return self.__eval_unary(expr_ast, Type.BOOL, lambda x: not x)
-        if expr_ast.elem_type == Interpreter.LAMBDA_DEF:
-            return Value(Type.CLOSURE, Closure(expr_ast, self.env))
-        if expr_ast.elem_type == Interpreter.OBJ_DEF:
-            return Value(Type.OBJECT, Object())
-        if expr_ast.elem_type == Interpreter.MCALL_DEF:
-            return self.__call_method(expr_ast)
-        
+        return self.expr_dispatch[expr_ast.tag](expr_ast)
 
     def __eval_name(self, name_ast):
-        var_name = name_ast.get("name")
-        field = ""
-        if "." in var_name:
-            var_name, field = var_name.split('.')
-            obj = self.env.get(var_name)
-            if obj.type() == Type.OBJECT:
+        var_name = name_ast.var_name
+        field = name_ast.field
+        if field != "":
+            obj = self.env.frame[name_ast.slot]
+            if obj.t == Type.OBJECT:
                 if field == "proto":
-                    if obj.value().proto == None:
+                    if obj.v.proto == None:
                         super().error(
                             ErrorType.NAME_ERROR, f"Proto does not exist"
                         )
-                    return obj.value().proto
+                    return obj.v.proto
                 return self.__get_property_or_method(obj, field)
             else:
                 super().error(ErrorType.TYPE_ERROR, f"{var_name} is not an object")
 
-        val = self.env.get(var_name) 
+        val = self.env.frame[name_ast.slot]
         if val is not None:
             return val
         closure = self.__get_func_by_name(var_name, None)
@@ -288,37 +437,52 @@ class Interpreter(InterpreterBase):
         return Value(Type.CLOSURE, closure)
 
     def __get_property_or_method(self, obj, name):
-        obj = obj.value()
-        values = obj.get_values()
-        if name in values:
-            return values[name]
-        elif obj.proto is not None and obj.proto.type() == Type.OBJECT:
-            return self.__get_property_or_method(obj.proto, name)  # Recursive lookup
-        else:
-            super().error(ErrorType.NAME_ERROR, f"Property or method {name} not found")
+        cached = obj.v.lookup_cache.get(name)
+        if cached is not None and cached[1] == Object.layout_version:
+            return cached[0].values[name]
+        holder = self.__find_property_holder(obj, name)
+        obj.v.lookup_cache[name] = (holder, Object.layout_version)
+        return holder.values[name]
+
+    def __find_property_holder(self, obj, name):
+        curr_obj = obj.v
+        while name not in curr_obj.values:
+            proto = curr_obj.proto
+            if proto is None or proto.t != Type.OBJECT:
+                super().error(
+                    ErrorType.NAME_ERROR, f"Property or method {name} not found"
+                )
+            curr_obj = proto.v
+        return curr_obj
 
     def __call_method(self, expr_ast):
-        obj = self.env.get(expr_ast.get('objref'))
+        obj = self.env.get(expr_ast.slot)
         if obj is None:
             super().error(
                 ErrorType.NAME_ERROR, f'this is annoying'
             )
-        if obj.type() != Type.OBJECT:
+        if obj.t != Type.OBJECT:
             super().error(
                 ErrorType.TYPE_ERROR, f"Object does not exist"
             )
         target_closure = None
-        closure_name = expr_ast.get('name')
+        closure_name = expr_ast.name
+        cached = obj.v.lookup_cache.get(closure_name)
+        if cached is not None and cached[1] == Object.layout_version:
+            target_closure = cached[0].values[closure_name]
         curr_proto = obj
 
         while target_closure is None and curr_proto is not None:
-            obj_dict = curr_proto.value().get_values()
-            for val in obj_dict.keys():
-                if val == closure_name:
-                    target_closure = obj_dict[val]
-            curr_proto = curr_proto.value().proto # Key Line: This was obj.value().proto
+            obj_dict = curr_proto.v.values
+            if closure_name in obj_dict:
+                target_closure = obj_dict[closure_name]
+                obj.v.lookup_cache[closure_name] = (
+                    curr_proto.v,
+                    Object.layout_version,
+                )
+            curr_proto = curr_proto.v.proto # Key Line: This was obj.v.proto
 
-        # obj_dict = curr_proto.value().get_values()
+        # obj_dict = curr_proto.v.get_values()
         # for val in obj_dict.keys():
         #     if val == closure_name:
         #         target_closure = obj_dict[val]
@@ -331,204 +495,209 @@ class Interpreter(InterpreterBase):
             super().error(
                 ErrorType.NAME_ERROR, f"Not callable function 2"
             )
-        target_ast = target_closure.value().func_ast
-        new_env = { "this": obj }
-        self.__prepare_env_with_closed_variables(target_closure.value(), new_env)
-        self.__prepare_params(target_ast, expr_ast, new_env)
-        self.env.push(new_env)
-        _, return_val = self.__run_statements(target_ast.get("statements"))
+        target_ast = target_closure.v.func_ast
+        # captured variables (including a captured "this") take precedence over obj
+        params = self.__prepare_params(target_ast, expr_ast)
+        self.env.push(
+            ((self.this_slot, obj),), target_closure.v.captured_env.items(), params
+        )
+        _, return_val = self.__run_statements(target_ast.statements)
         self.env.pop()
         return return_val
 
-    def __eval_op(self, arith_ast):
-        left_value_obj = self.__eval_expr(arith_ast.get("op1"))
-        right_value_obj = self.__eval_expr(arith_ast.get("op2"))
-
-        if left_value_obj.type() == Type.OBJECT or right_value_obj.type() == Type.OBJECT:
-            if arith_ast.elem_type not in ["==", "!="]:
+    # evaluate an operator expression by running its compiled code on a value stack
+    def __eval_code(self, expr_ast):
+        frame = self.env.frame
+        stack = []
+        for opcode, arg in expr_ast.code:
+            if opcode == LOAD_VAR:
+                value = frame[arg.slot]
+                stack.append(value if value is not None else self.__eval_name(arg))
+            elif opcode == LOAD_CONST:
+                stack.append(arg)
+            elif opcode == INT_BINARY_OP:
+                operation, int_op = arg
+                right_value_obj = stack.pop()
+                left_value_obj = stack[-1]
+                if left_value_obj.t is Type.INT and right_value_obj.t is Type.INT:
+                    stack[-1] = int_op(left_value_obj.v, right_value_obj.v)
+                else:
+                    stack[-1] = self.__eval_op(
+                        operation, left_value_obj, right_value_obj
+                    )
+            elif opcode == BINARY_OP:
+                right_value_obj = stack.pop()
+                stack[-1] = self.__eval_op(arg, stack[-1], right_value_obj)
+            elif opcode == UNARY_OP:
+                stack[-1] = self.__eval_unary(arg, stack[-1])
+            elif opcode == EVAL:
+                stack.append(self.__eval_expr(arg))
+        return stack[0]
+
+    def __eval_op(self, operation, left_value_obj, right_value_obj):
+        if left_value_obj.t == Type.OBJECT or right_value_obj.t == Type.OBJECT:
+            if operation not in ["==", "!="]:
                 super().error(
                     ErrorType.TYPE_ERROR,
                     "Invalid operation on object type"
                 )
             else:
-                are_equal = left_value_obj.value() is right_value_obj.value()
-                return Value(Type.BOOL, are_equal if arith_ast.elem_type == "==" else not are_equal)
+                are_equal = left_value_obj.v is right_value_obj.v
+                return bool_value(are_equal if operation == "==" else not are_equal)
         else:
-            left_value_obj, right_value_obj = self.__bin_op_promotion(
-                arith_ast.elem_type, left_value_obj, right_value_obj
+            left_value_obj, right_value_obj = self.promotions[operation](
+                left_value_obj, right_value_obj
             )
 
-            if not self.__compatible_types(
-                arith_ast.elem_type, left_value_obj, right_value_obj
+            # DOCUMENT: allow comparisons ==/!= of anything against anything
+            if (
+                left_value_obj.t is not right_value_obj.t
+                and operation != "=="
+                and operation != "!="
             ):
                 super().error(
                     ErrorType.TYPE_ERROR,
-                    f"Incompatible types for {arith_ast.elem_type} operation",
+                    f"Incompatible types for {operation} operation",
                 )
-            if arith_ast.elem_type not in self.op_to_lambda[left_value_obj.type()]:
+            f = self.op_table.get((left_value_obj.t, operation))
+            if f is None:
                 super().error(
                     ErrorType.TYPE_ERROR,
-                    f"Incompatible operator {arith_ast.elem_type} for type {left_value_obj.type()}",
+                    f"Incompatible operator {operation} for type {left_value_obj.t}",
                 )
-        
-            f = self.op_to_lambda[left_value_obj.type()][arith_ast.elem_type]
             return f(left_value_obj, right_value_obj)
 
-    # bool and int, int and bool for and/or/==/!= -> coerce int to bool
-    # bool and int, int and bool for arithmetic ops, coerce true to 1, false to 0
-    def __bin_op_promotion(self, operation, op1, op2):
-        if operation in self.op_to_lambda[Type.BOOL]:  # && or ||
-            
-            # If this operation is still allowed in the ints, then continue
-            if operation in self.op_to_lambda[Type.INT] and op1.type() == Type.INT \
-                and op2.type() == Type.INT:
-                pass
-            else:
-                if op1.type() == Type.INT:
-                    op1 = Interpreter.__int_to_bool(op1)
-                if op2.type() == Type.INT:
-                    op2 = Interpreter.__int_to_bool(op2)
-        
-        if operation in self.op_to_lambda[Type.INT]:  # +, -, *, /
-            if op1.type() == Type.BOOL:
-                op1 = Interpreter.__bool_to_int(op1)
-            if op2.type() == Type.BOOL:
-                op2 = Interpreter.__bool_to_int(op2)
-        return (op1, op2)
-
     def __unary_op_promotion(self, operation, op1):
-        if operation == "!" and op1.type() == Type.INT:
+        if operation == "!" and op1.t == Type.INT:
             op1 = Interpreter.__int_to_bool(op1)
         return op1
 
     @staticmethod
     def __int_to_bool(value):
-        return Value(Type.BOOL, value.value() != 0)
+        return bool_value(value.v != 0)
 
+    # pass-by-value copy used for arguments and return values; ints, bools, strings
+    # and nil hold immutable payloads, so re-wrapping them is as good as a deep copy
     @staticmethod
-    def __bool_to_int(value):
-        return Value(Type.INT, 1 if value.value() else 0)
-
-    def __compatible_types(self, oper, obj1, obj2):
-        # DOCUMENT: allow comparisons ==/!= of anything against anything
-        if oper in ["==", "!="]:
-            return True
-        return obj1.type() == obj2.type()
+    def __copy_value(value):
+        t = value.t
+        if t is Type.OBJECT or t is Type.CLOSURE:
+            return copy.deepcopy(value)
+        return Value(t, value.v)
 
-    def __eval_unary(self, arith_ast, t, f):
-        value_obj = self.__eval_expr(arith_ast.get("op1"))
-        value_obj = self.__unary_op_promotion(arith_ast.elem_type, value_obj)
+    def __eval_unary(self, operation, value_obj):
+        t, f = _UNARY_OPS[operation]
+        value_obj = self.__unary_op_promotion(operation, value_obj)
 
-        if value_obj.type() != t:
+        if value_obj.t != t:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible type for {arith_ast.elem_type} operation",
+                f"Incompatible type for {operation} operation",
             )
-        return Value(t, f(value_obj.value()))
-
-    def __setup_ops(self):
-        self.op_to_lambda = {}
-        # set up operations on integers
-        self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
-        )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
-            x.type(), x.value() - y.value()
-        )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
-            x.type(), x.value() * y.value()
-        )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
-            x.type(), x.value() // y.value()
-        )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
-            Type.BOOL, x.value() < y.value()
-        )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
-            Type.BOOL, x.value() <= y.value()
-        )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
-            Type.BOOL, x.value() > y.value()
-        )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
-            Type.BOOL, x.value() >= y.value()
-        )
-        #  set up operations on strings
-        self.op_to_lambda[Type.STRING] = {}
-        self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
-        )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
-        #  set up operations on bools
-        self.op_to_lambda[Type.BOOL] = {}
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
-            x.type(), x.value() and y.value()
-        )
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
-            x.type(), x.value() or y.value()
-        )
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
+        return f(value_obj.v)
 
-        #  set up operations on nil
-        self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
-
-        #  set up operations on closures
-        self.op_to_lambda[Type.CLOSURE] = {}
-        self.op_to_lambda[Type.CLOSURE]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.CLOSURE]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
+    @staticmethod
+    def __by_tag(handlers):
+        table = [None] * len(Interpreter.NODE_TAGS)
+        for elem_type, handler in handlers.items():
+            table[Interpreter.NODE_TAGS[elem_type]] = handler
+        return table
 
-        self.op_to_lambda[Type.OBJECT] = {}
-        self.op_to_lambda[Type.OBJECT]["=="] = lambda x, y: Value(
-            Type.BOOL, x is y
-        )
-        self.op_to_lambda[Type.OBJECT]["!="] = lambda x, y: Value(
-            Type.BOOL, x is not y
+    def __setup_ops(self):
+        # map each expression/statement node type to the method that evaluates it,
+        # so dispatch is a single list index instead of a chain of comparisons
+        expr_handlers = {
+            InterpreterBase.NIL_DEF: lambda ast: Interpreter.NIL_VALUE,
+            InterpreterBase.INT_DEF: lambda ast: int_value(ast.val),
+            InterpreterBase.STRING_DEF: lambda ast: Value(Type.STRING, ast.val),
+            InterpreterBase.BOOL_DEF: lambda ast: bool_value(ast.val),
+            InterpreterBase.VAR_DEF: self.__eval_name,
+            InterpreterBase.FCALL_DEF: self.__call_func,
+            InterpreterBase.NEG_DEF: self.__eval_code,
+            InterpreterBase.NOT_DEF: self.__eval_code,
+            InterpreterBase.LAMBDA_DEF: lambda ast: Value(
+                Type.CLOSURE, Closure(ast, self.env)
+            ),
+            InterpreterBase.OBJ_DEF: lambda ast: Value(Type.OBJECT, Object()),
+            InterpreterBase.MCALL_DEF: self.__call_method,
+        }
+        for op in Interpreter.BIN_OPS:
+            expr_handlers[op] = self.__eval_code
+        self.expr_dispatch = Interpreter.__by_tag(expr_handlers)
+
+        # statements that don't match a handler (e.g. bare expressions) are skipped
+        statement_handlers = {
+            InterpreterBase.FCALL_DEF: self.__do_fcall,
+            "=": self.__assign,
+            InterpreterBase.MCALL_DEF: self.__do_mcall,
+            InterpreterBase.RETURN_DEF: self.__do_return,
+            InterpreterBase.IF_DEF: self.__do_if,
+            InterpreterBase.WHILE_DEF: self.__do_while,
+        }
+        self.statement_dispatch = Interpreter.__by_tag(statement_handlers)
+
+        self.promotions = {
+            "&&": _ints_to_bools,
+            "||": _ints_to_bools,
+            "==": _truth_values,
+            "!=": _truth_values,
+            "+": _bools_to_ints,
+            "-": _bools_to_ints,
+            "*": _bools_to_ints,
+            "/": _bools_to_ints,
+            "<": _bools_to_ints,
+            "<=": _bools_to_ints,
+            ">": _bools_to_ints,
+            ">=": _bools_to_ints,
+        }
+
+        # binary operations keyed by (type of the left operand, operator)
+        self.op_table = {
+            (Type.INT, "+"): _add,
+            (Type.INT, "-"): _sub,
+            (Type.INT, "*"): _mul,
+            (Type.INT, "/"): _div,
+            (Type.INT, "=="): _eq,
+            (Type.INT, "!="): _ne,
+            (Type.INT, "<"): _lt,
+            (Type.INT, "<="): _le,
+            (Type.INT, ">"): _gt,
+            (Type.INT, ">="): _ge,
+            (Type.STRING, "+"): _add,
+            (Type.STRING, "=="): _eq,
+            (Type.STRING, "!="): _ne,
+            (Type.BOOL, "&&"): _and,
+            (Type.BOOL, "||"): _or,
+            (Type.BOOL, "=="): _eq,
+            (Type.BOOL, "!="): _ne,
+            (Type.NIL, "=="): _eq,
+            (Type.NIL, "!="): _ne,
+            (Type.CLOSURE, "=="): _eq,
+            (Type.CLOSURE, "!="): _ne,
+            (Type.OBJECT, "=="): _same,
+            (Type.OBJECT, "!="): _not_same,
+        }
+
+    # evaluate the condition of an if/while statement to a python bool; ints are
+    # treated as true when non-zero, and anything other than a bool or int is an error
+    def __test_condition(self, cond_ast, statement_kind):
+        result = self.__eval_expr(cond_ast)
+        if result.t is Type.BOOL:
+            return result.v
+        if result.t is Type.INT:
+            return result.v != 0
+        super().error(
+            ErrorType.TYPE_ERROR,
+            f"Incompatible type for {statement_kind} condition",
         )
-        
 
     def __do_if(self, if_ast):
-        cond_ast = if_ast.get("condition")
-        result = self.__eval_expr(cond_ast)
-        if result.type() == Type.INT:
-            result = Interpreter.__int_to_bool(result)
-        if result.type() != Type.BOOL:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                "Incompatible type for if condition",
-            )
-        if result.value():
-            statements = if_ast.get("statements")
+        if self.__test_condition(if_ast.condition, InterpreterBase.IF_DEF):
+            statements = if_ast.statements
             status, return_val = self.__run_statements(statements)
             return (status, return_val)
         else:
-            else_statements = if_ast.get("else_statements")
+            else_statements = if_ast.else_statements
             if else_statements is not None:
                 status, return_val = self.__run_statements(else_statements)
                 return (status, return_val)
@@ -536,30 +705,20 @@ class Interpreter(InterpreterBase):
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __do_while(self, while_ast):
-        cond_ast = while_ast.get("condition")
-        run_while = Interpreter.TRUE_VALUE
-        while run_while.value():
-            run_while = self.__eval_expr(cond_ast)
-            if run_while.type() == Type.INT:
-                run_while = Interpreter.__int_to_bool(run_while)
-            if run_while.type() != Type.BOOL:
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    "Incompatible type for while condition",
-                )
-            if run_while.value():
-                statements = while_ast.get("statements")
-                status, return_val = self.__run_statements(statements)
-                if status == ExecStatus.RETURN:
-                    return status, return_val
+        cond_ast = while_ast.condition
+        statements = while_ast.statements
+        while self.__test_condition(cond_ast, InterpreterBase.WHILE_DEF):
+            status, return_val = self.__run_statements(statements)
+            if status == ExecStatus.RETURN:
+                return status, return_val
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __do_return(self, return_ast):
-        expr_ast = return_ast.get("expression")
+        expr_ast = return_ast.expression
         if expr_ast is None:
             return (ExecStatus.RETURN, Interpreter.NIL_VALUE)
-        value_obj = copy.deepcopy(self.__eval_expr(expr_ast))
+        value_obj = Interpreter.__copy_value(self.__eval_expr(expr_ast))
         return (ExecStatus.RETURN, value_obj)
 
 
@@ -1,5 +1,3 @@
-import copy
-
 from enum import Enum
 from intbase import InterpreterBase
 
@@ -13,35 +11,56 @@ class Type(Enum):
     NIL = 5
     OBJECT = 6
 
+    # members are singletons compared by identity, so hash them by identity as well;
+    # Enum's default hash is a Python-level call paid on every op_table lookup
+    __hash__ = object.__hash__
+
+SCALAR_TYPES = (Type.INT, Type.BOOL, Type.STRING, Type.NIL)
+
 class Object:
+    # Bumped by any change that could make a name resolve to a different object along
+    # some prototype chain: adding a field, changing a proto, or repointing a Value
+    # that refers to an object (see Value.set). Replacing an existing field's value
+    # doesn't change where that field is found, so it leaves the version alone.
+    layout_version = 0
+
     def __init__(self):
         self.values = {}
         self.type = Type.OBJECT
         self.proto = None
+        # name -> (object along the proto chain that holds it, layout_version)
+        self.lookup_cache = {}
 
     def get_values(self):
         return self.values
     
     def set(self, field, symbol):
+        if field not in self.values:
+            Object.layout_version += 1
         self.values[field] = symbol
 
     def set_proto(self, new_proto):
+        Object.layout_version += 1
         self.proto = new_proto
 
 class Closure:
     def __init__(self, func_ast, env):
-        self.captured_env = {}
-        for var_name, value in env:
-            if value.type() in [Type.INT, Type.BOOL, Type.STRING, Type.NIL]:
-                self.captured_env[var_name] = copy.deepcopy(value)
-            else:
-                self.captured_env[var_name] = value
+        # scalars are snapshotted (their payloads are immutable, so a fresh Value is
+        # a full copy); objects and closures are captured by reference
+        self.captured_env = {
+            var_name: Value(value.t, value.v) if value.t in SCALAR_TYPES else value
+            for var_name, value in env
+        }
         self.func_ast = func_ast
         self.type = Type.CLOSURE
 
 
-# Represents a value, which has a type and its value
+# Represents a value, which has a type and its value. Values are created for every
+# literal and intermediate result, so they're kept to two fixed slots with no
+# per-instance __dict__: one allocation per Value instead of two.
 class Value:
+    __slots__ = ("t", "v")
+
     def __init__(self, t, v=None):
         self.t = t
         self.v = v
@@ -52,11 +71,37 @@ class Value:
     def type(self):
         return self.t
 
+    # shallow copy: a new Value with the same type and payload (objects and closures
+    # are shared, not duplicated)
+    def copy(self):
+        return Value(self.t, self.v)
+
     def set(self, other):
+        if self.t is Type.OBJECT:
+            # this Value may be some object's proto
+            Object.layout_version += 1
         self.t = other.t
         self.v = other.v
 
 
+# Shared Values for the most common results, in the spirit of CPython's small int
+# cache. Values are mutable, so these must only be handed out as temporaries: the
+# interpreter copies a Value before binding it to a variable, a field or a parameter.
+SMALL_INTS = [Value(Type.INT, i) for i in range(-5, 257)]
+TRUE_VALUE = Value(Type.BOOL, True)
+FALSE_VALUE = Value(Type.BOOL, False)
+
+
+def int_value(i):
+    if -5 <= i <= 256:
+        return SMALL_INTS[i + 5]
+    return Value(Type.INT, i)
+
+
+def bool_value(b):
+    return TRUE_VALUE if b else FALSE_VALUE
+
+
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
         return Value(Type.BOOL, True)
@@ -75,12 +120,12 @@ def create_value(val):
 
 
 def get_printable(val):
-    if val.type() == Type.INT:
-        return str(val.value())
-    if val.type() == Type.STRING:
-        return val.value()
-    if val.type() == Type.BOOL:
-        if val.value() is True:
+    if val.t == Type.INT:
+        return str(val.v)
+    if val.t == Type.STRING:
+        return val.v
+    if val.t == Type.BOOL:
+        if val.v is True:
             return "true"
         return "false"
     return None